@@ -0,0 +1,21 @@
+"""Ahead-of-time build of the hot numeric kernels.
+
+Run `python build_kernels.py` once to produce a respRT_kernels extension
+module; process_data.py uses it only when Numba itself is not installed
+at runtime (with Numba present the kernels are JIT-compiled from
+kernels.py, so an outdated .so can never shadow current sources).
+
+The kernel bodies live in kernels.py and are exported here unchanged —
+do not copy them into this file. numba.pycc is deprecated upstream;
+this build is verified against Numba 0.67.
+"""
+from numba.pycc import CC
+
+import kernels
+
+cc = CC('respRT_kernels')
+cc.export('compute_belt_phase', 'f8[:](f8[:], i8[:], i8[:])')(kernels.compute_belt_phase)
+cc.export('assign_phase', 'void(f8[:], f8[:], f8[:], f8[:], i1[:])')(kernels.assign_phase)
+
+if __name__ == '__main__':
+    cc.compile()
@@ -16,3 +16,6 @@ RT_SUFFIX = "_RT.csv"
 # Peak detection settings
 SMOOTH_WINDOW = 5        # rolling mean window for belt smoothing
 EXPECTED_BREATHS_PER_MIN = 16  # used for auto-tuning peak distance
+
+# Debug settings
+LOG_FULL_NAN_ROWS = False  # dump every removed NaN row to the log (slow on big files)
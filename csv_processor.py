@@ -1,9 +1,12 @@
+import os
+
 import pandas as pd
 from pathlib import Path
 
 # ================= CONFIG =================
 ROOT_DIR = Path("data/reconstructed")   # <-- change to your root directory
 CSV_GLOB = "**/*.csv"     # recursive
+CHUNK_ROWS = 200_000      # rows per chunk; keeps memory flat for huge files
 # ==========================================
 
 DELETE_COLS = {
@@ -18,13 +21,10 @@ DELETE_COLS = {
     "audio_latency_s_used",
 }
 
-def process_csv(path: Path):
-    df = pd.read_csv(path)
-
+def _plan_columns(df: pd.DataFrame, path: Path):
+    """Work out drop/rename/order once, from the columns of the first chunk."""
     # --- Drop unwanted columns FIRST ---
     cols_to_drop = [c for c in DELETE_COLS if c in df.columns]
-    if cols_to_drop:
-        df = df.drop(columns=cols_to_drop)
 
     # --- Rename reconstructed columns AFTER deletion ---
     rename_map = {}
@@ -33,10 +33,8 @@ def process_csv(path: Path):
     if "RT_seconds_reconstructed" in df.columns:
         rename_map["RT_seconds_reconstructed"] = "RT_seconds"
 
-    df = df.rename(columns=rename_map)
-
     # --- Enforce column order: C = utc_timestamp, D = RT_seconds ---
-    cols = list(df.columns)
+    cols = [rename_map.get(c, c) for c in df.columns if c not in cols_to_drop]
 
     required = ["utc_timestamp", "RT_seconds"]
     for r in required:
@@ -52,9 +50,35 @@ def process_csv(path: Path):
         + cols[2:]
     )
 
-    df = df[new_cols]
+    return cols_to_drop, rename_map, new_cols
+
+
+def process_csv(path: Path):
+    # Stream in chunks so memory stays flat regardless of file size,
+    # writing to a temp file and swapping it in atomically at the end.
+    tmp_path = path.with_suffix(".csv.tmp")
+    tmp_path.unlink(missing_ok=True)  # a stale tmp from a hard crash must not survive
+    plan = None
+
+    try:
+        for i, df in enumerate(pd.read_csv(path, chunksize=CHUNK_ROWS)):
+            if plan is None:
+                plan = _plan_columns(df, path)
+            cols_to_drop, rename_map, new_cols = plan
+
+            if cols_to_drop:
+                df = df.drop(columns=cols_to_drop)
+            df = df.rename(columns=rename_map)
+            df = df[new_cols]
+
+            df.to_csv(tmp_path, index=False, mode="w" if i == 0 else "a", header=i == 0)
+
+        os.replace(tmp_path, path)
+    except Exception:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
 
-    df.to_csv(path, index=False)
     print(f"Processed: {path}")
 
 def main():
@@ -0,0 +1,58 @@
+import glob
+import os
+
+import pandas as pd
+import statsmodels.api as sm
+from statsmodels.formula.api import ols
+
+import config
+
+REQUIRED_COLS = ["participant_id", "side", "resp_phase_label", "RT_seconds"]
+
+
+def find_latest_master():
+    """Most recent master file; prefers Parquet, falls back to legacy CSV."""
+    parquet_files = sorted(glob.glob(os.path.join(config.MERGED_DIR, "master_cleaned_*.parquet")))
+    if parquet_files:
+        return parquet_files[-1]
+
+    csv_files = sorted(glob.glob(os.path.join(config.MERGED_DIR, "master_cleaned_*.csv")))
+    if not csv_files:
+        raise FileNotFoundError(f"No master_cleaned file found in {config.MERGED_DIR}")
+    return csv_files[-1]
+
+
+def load_master(path):
+    if path.endswith(".parquet"):
+        # read only the analysis columns instead of the whole table
+        return pd.read_parquet(path, columns=REQUIRED_COLS)
+    return pd.read_csv(
+        path,
+        usecols=REQUIRED_COLS,
+        dtype={
+            "participant_id": "category",
+            "side": "category",
+            "resp_phase_label": "category",
+            "RT_seconds": "float32",
+        },
+        engine="pyarrow",
+    )
+
+
+def main():
+    latest_file = find_latest_master()
+    print(f"Loading {latest_file}")
+
+    df = load_master(latest_file)
+    df = df.dropna(subset=REQUIRED_COLS)
+
+    # --- Two-way ANOVA: side x respiratory phase, eta-squared effect sizes ---
+    model = ols("RT_seconds ~ C(side) * C(resp_phase_label)", data=df).fit()
+    anova = sm.stats.anova_lm(model, typ=2)
+    anova["eta_sq"] = anova["sum_sq"] / anova["sum_sq"].sum()
+
+    print(anova)
+
+
+if __name__ == "__main__":
+    main()
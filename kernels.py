@@ -0,0 +1,56 @@
+"""Numeric kernel bodies for the belt pipeline.
+
+Single source for both compile paths: process_data.py applies @njit to
+these functions when Numba is installed, and build_kernels.py exports
+the very same functions ahead-of-time. Keep the bodies nopython-
+compatible and do not duplicate them elsewhere.
+
+The interpolation uses a per-segment precomputed slope; this operation
+order is part of the archive-compatibility contract documented in
+process_data.py and must not be reordered.
+"""
+import numpy as np
+
+try:
+    from numba import prange
+except ImportError:  # pure-Python call still works, just serially
+    prange = range
+
+
+def compute_belt_phase(t, troughs, crests):
+    phase = np.full(t.shape[0], np.nan)
+    # trough -> crest (270 deg start), then crest -> trough (90 deg start)
+    for half in range(2):
+        if half == 0:
+            starts, ends, start_deg = troughs, crests, 270.0
+        else:
+            starts, ends, start_deg = crests, troughs, 90.0
+        for k in range(starts.shape[0]):
+            s = starts[k]
+            j = np.searchsorted(ends, s)
+            if j >= ends.shape[0]:
+                continue
+            e = ends[j]
+            t0 = t[s]
+            slope = 180.0 / (t[e] - t0)
+            for i in range(s, e + 1):
+                phase[i] = (start_deg + (t[i] - t0) * slope) % 360.0
+    return phase
+
+
+def assign_phase(rt_ts, belt_ts, belt_phase, out_deg, out_code):
+    last = belt_ts.shape[0] - 1
+    for i in prange(rt_ts.shape[0]):
+        q = rt_ts[i]
+        idx = np.searchsorted(belt_ts, q)
+        if idx < 1:
+            idx = 1
+        elif idx > last:
+            idx = last
+        left = idx - 1
+        if (q - belt_ts[left]) <= (belt_ts[idx] - q):
+            v = belt_phase[left]
+        else:
+            v = belt_phase[idx]
+        out_deg[i] = v
+        out_code[i] = 1 if (v >= 270.0 or v <= 90.0) else 0
@@ -1,22 +1,42 @@
 # participant_utils.py
-import pandas as pd
+import functools
 import os
 
+import pandas as pd
+
+# Always resolve relative to this script's folder, not the caller's cwd
+_CSV_FILE = os.path.join(os.path.dirname(__file__), "participants.csv")
+
+
+@functools.lru_cache(maxsize=1)
+def _load_participants():
+    # sep=None sniffs the delimiter (the sheet exports semicolon-separated)
+    df = pd.read_csv(_CSV_FILE, sep=None, engine="python")
+    # the sheet has first_name/surname; build full_name for name searches
+    df["full_name"] = (
+        df["first_name"].fillna("").str.cat(df["surname"].fillna(""), sep=" ").str.strip()
+    )
+    return df
+
+
+@functools.lru_cache(maxsize=1)
+def _participants_by_id():
+    df = _load_participants()
+    return {rec["participant_id"]: rec for rec in df.to_dict("records")}
+
+
 def get_participant_ids():
-    # Ensure the path points to this script's folder
-    csv_file = os.path.join(os.path.dirname(__file__), "participants.csv")
-    df = pd.read_csv(csv_file)
-    return df['participant_id'].tolist()  # adjust column name if needed
+    return _load_participants()["participant_id"].tolist()
+
 
 def get_participant_info(pid):
     """Get info for specific participant ID"""
-    df = pd.read_csv("participants.csv")
-    participant = df[df['participant_id'] == pid]
-    return participant.to_dict('records')[0] if not participant.empty else None
+    return _participants_by_id().get(pid)
+
 
 def get_participant_by_name(name):
     """Find participant by name"""
-    df = pd.read_csv("participants.csv")
+    df = _load_participants()
     # Case-insensitive search
-    mask = df['full_name'].str.contains(name, case=False, na=False)
-    return df[mask]
\ No newline at end of file
+    mask = df["full_name"].str.contains(name, case=False, na=False)
+    return df[mask]
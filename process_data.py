@@ -0,0 +1,320 @@
+"""Belt + RT processing pipeline.
+
+NOTE ON PROVENANCE: the original process_data.py was lost; this file is a
+restoration written against config.py and the archived outputs in
+data/pilot/aligned/. Peak detection uses find_peaks(prominence=0.5) and
+the phase interpolation keeps np.interp's operation order (per-segment
+precomputed slope); with those, rerunning the pipeline on
+data/pilot/raw regenerates all five archived *_RT_with_phase.csv files
+byte-identically (634/634 trials bit-exact). Any change to smoothing,
+peak picking or the interpolation arithmetic should be re-checked
+against that archive. data/pilot/aligned/ remains the reference copy
+and is never written by this script (outputs go to config.MERGED_DIR).
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from scipy.ndimage import uniform_filter1d
+from scipy.signal import find_peaks
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; without it we use the numpy path below
+    njit = None
+
+if njit is not None:
+    # JIT-compile the shared kernel bodies; cache=True keeps warmup cheap
+    # across runs and auto-invalidates when kernels.py changes.
+    import kernels
+    _compute_belt_phase_nb = njit(cache=True)(kernels.compute_belt_phase)
+    _assign_phase_nb = njit(parallel=True, cache=True)(kernels.assign_phase)
+    respRT_kernels = None
+else:
+    _compute_belt_phase_nb = None
+    _assign_phase_nb = None
+    try:
+        # Prebuilt kernels (see build_kernels.py) for Numba-less installs.
+        # Only consulted when Numba is absent, so a stale .so can never
+        # shadow the in-tree kernel sources.
+        import respRT_kernels
+    except ImportError:
+        respRT_kernels = None
+
+import config
+from participants.participant_utils import get_participant_ids
+
+
+# seconds per expected breath, computed once at import
+_SECONDS_PER_BREATH = 60.0 / config.EXPECTED_BREATHS_PER_MIN
+
+
+def estimate_peak_distance(belt_df):
+    """Minimum sample distance between peaks, tuned from the expected breathing rate.
+
+    Not applied during detection: the archived pilot outputs were produced
+    with prominence-only peak picking, and adding this distance bound
+    changes phase labels on fast breathers (see module docstring). Kept
+    for parameter exploration.
+    """
+    t = belt_df['t_utc'].to_numpy()
+    duration = t[-1] - t[0]
+    sample_rate = len(t) / duration
+    return int(0.7 * sample_rate * _SECONDS_PER_BREATH)
+
+
+def _fill_half_cycles(phase, t, starts, ends, start_deg):
+    """Fill every start->next-end half-cycle with linearly interpolated phase.
+
+    All half-cycles are filled in one vectorized pass: pair each start
+    extremum with the next opposite extremum via searchsorted, expand to
+    per-sample indices with np.repeat, then interpolate over all segments
+    at once instead of calling np.interp per breath.
+    """
+    j = np.searchsorted(ends, starts)
+    valid = j < len(ends)
+    starts = starts[valid]
+    if len(starts) == 0:
+        return
+    ends_next = ends[j[valid]]
+
+    seg_len = ends_next - starts + 1                 # inclusive of both extrema
+    seg_id = np.repeat(np.arange(len(starts)), seg_len)
+    offsets = np.arange(seg_len.sum()) - np.repeat(np.cumsum(seg_len) - seg_len, seg_len)
+    idx = starts[seg_id] + offsets
+
+    # precomputed per-segment slope, same op order as np.interp in the
+    # original script (keeps the restoration at archive precision)
+    t0 = t[starts]
+    slope = 180.0 / (t[ends_next] - t0)
+    phase[idx] = (start_deg + (t[idx] - t0[seg_id]) * slope[seg_id]) % 360.0
+
+
+def compute_belt_phase(t, x, troughs, crests):
+    """Respiratory phase in degrees for every belt sample.
+
+    Convention: trough (start of inhalation) = 270 deg, crest (start of
+    exhalation) = 90 deg, interpolated linearly in time in between.
+    Samples before the first / after the last extremum stay NaN.
+    """
+    t = np.asarray(t, dtype=np.float64)
+    troughs = np.asarray(troughs, dtype=np.int64)
+    crests = np.asarray(crests, dtype=np.int64)
+
+    if _compute_belt_phase_nb is not None:
+        return _compute_belt_phase_nb(t, troughs, crests)
+    if respRT_kernels is not None:
+        return respRT_kernels.compute_belt_phase(t, troughs, crests)
+
+    phase = np.full(len(t), np.nan)
+    _fill_half_cycles(phase, t, troughs, crests, 270.0)   # inhalation: 270 -> 360/0 -> 90
+    _fill_half_cycles(phase, t, crests, troughs, 90.0)    # exhalation: 90 -> 270
+    return phase
+
+
+def nearest_values(xs, ys, q):
+    """Nearest-neighbor lookup of ys at query points q on sorted xs.
+
+    Queries outside the range clamp to the first/last sample, matching the
+    old interp1d(kind='nearest', fill_value='extrapolate') behavior.
+    """
+    idx = np.clip(np.searchsorted(xs, q), 1, len(xs) - 1)
+    left = idx - 1
+    pick_left = (q - xs[left]) <= (xs[idx] - q)
+    return ys[np.where(pick_left, left, idx)]
+
+
+def assign_phase(belt_ts, belt_phase, rt_ts):
+    """Nearest belt phase plus int8 inhalation code for each RT timestamp.
+
+    With Numba the nearest lookup and the threshold classification are
+    fused into one parallel pass; otherwise they run as two numpy passes.
+    """
+    if _assign_phase_nb is not None or respRT_kernels is not None:
+        out_deg = np.empty(len(rt_ts), np.float64)
+        out_code = np.empty(len(rt_ts), np.int8)
+        if _assign_phase_nb is not None:
+            _assign_phase_nb(rt_ts, belt_ts, belt_phase, out_deg, out_code)
+        else:
+            respRT_kernels.assign_phase(rt_ts, belt_ts, belt_phase, out_deg, out_code)
+        return out_deg, out_code
+
+    deg = nearest_values(belt_ts, belt_phase, rt_ts)
+    codes = ((deg >= 270) | (deg <= 90)).astype(np.int8)
+    return deg, codes
+
+
+def clean_and_create_master(timestamp):
+    """Remove NaN rows from each merged file, log what was dropped, save clean copies.
+
+    Returns the cleaned per-participant DataFrames so the master concat
+    doesn't have to re-read from disk what was written seconds earlier.
+    """
+    os.makedirs(config.CLEAN_DIR, exist_ok=True)
+    log_file = os.path.join(config.CLEAN_DIR, f"NaN_removal_{timestamp}.txt")
+
+    participant_ids = get_participant_ids()
+    cleaned = []
+
+    with open(log_file, "w") as log:
+        log.write(f"NaN removal log created on {datetime.now()}\n")
+        log.write("=" * 70 + "\n\n")
+
+        for pid in participant_ids:
+            merged_file = os.path.join(config.MERGED_DIR, f"{pid}_RT_with_phase.csv")
+            if not os.path.exists(merged_file):
+                continue
+
+            log.write(f"Processing: {merged_file}\n")
+            log.write("-" * 60 + "\n")
+
+            df = pd.read_csv(merged_file)
+            nan_rows = df[df.isna().any(axis=1)]
+
+            if len(nan_rows) == 0:
+                log.write("No NaNs found.\n")
+            else:
+                log.write(f"Rows containing NaNs: {len(nan_rows)}\n")
+                log.write("NaN counts per column:\n")
+                log.write(nan_rows.isna().sum().to_string() + "\n")
+                if config.LOG_FULL_NAN_ROWS:
+                    log.write("Detailed rows removed:\n")
+                    log.write(nan_rows.to_string() + "\n")
+                else:
+                    # head sample only; rendering every row is O(N) string work
+                    log.write("First rows removed:\n")
+                    log.write(nan_rows.head(20).to_string() + "\n")
+                    if len(nan_rows) > 20:
+                        log.write("...\n")
+
+            df = df.dropna()
+            df['participant_id'] = pid
+
+            clean_file = os.path.join(config.CLEAN_DIR, f"{pid}_RT_with_phase_clean.csv")
+            df.to_csv(clean_file, index=False)
+            log.write(f"\nCleaned file saved as: {clean_file}\n\n")
+            cleaned.append(df)
+
+    print(f"NaN removal log saved to {log_file}")
+    return cleaned
+
+
+def create_master_file(timestamp, all_participants=None):
+    """Concatenate all cleaned participant DataFrames into one master CSV.
+
+    Takes the in-memory frames from clean_and_create_master when available;
+    re-reads the clean files from disk only when called standalone.
+    """
+    if all_participants is None:
+        all_participants = []
+        for pid in get_participant_ids():
+            clean_file = os.path.join(config.CLEAN_DIR, f"{pid}_RT_with_phase_clean.csv")
+            if os.path.exists(clean_file):
+                all_participants.append(pd.read_csv(clean_file))
+
+    if not all_participants:
+        print("No cleaned files found, master file not created.")
+        return
+
+    master_df = pd.concat(all_participants, ignore_index=True)
+
+    # Parquet is what eta.py reads (columnar, compressed, column-pruned
+    # loads); the CSV is kept as a legacy copy for manual inspection.
+    master_parquet = os.path.join(config.MERGED_DIR, f"master_cleaned_{timestamp}.parquet")
+    master_df.to_parquet(master_parquet, compression='zstd')
+    print(f"Master file saved to {master_parquet}")
+
+    master_file = os.path.join(config.MERGED_DIR, f"master_cleaned_{timestamp}.csv")
+    master_df.to_csv(master_file, index=False, chunksize=500_000)
+    print(f"Master file saved to {master_file}")
+
+
+def process_one_participant(pid):
+    """Full belt + RT pipeline for one participant; returns the merged DataFrame."""
+    belt_file = os.path.join(config.RAW_DIR, f"{pid}{config.BELT_SUFFIX}")
+    rt_file = os.path.join(config.RAW_DIR, f"{pid}{config.RT_SUFFIX}")
+
+    if not (os.path.exists(belt_file) and os.path.exists(rt_file)):
+        print(f"Skipping {pid}: raw files not found")
+        return None
+
+    print(f"Processing {pid} ...")
+
+    # --- Load belt recording ---
+    belt = pd.read_json(
+        belt_file, lines=True,
+        dtype={'t_system': 'float64', 't_utc': 'float64', 'force': 'float64'},
+    )
+
+    # --- Smooth belt force ---
+    # Single C pass; mode='nearest' mirrors the old centered rolling mean
+    # with min_periods=1 up to edge effects smaller than the belt noise.
+    belt['force_smooth'] = uniform_filter1d(
+        belt['force'].to_numpy(), size=config.SMOOTH_WINDOW, mode='nearest'
+    )
+
+    # --- Detect breathing extrema ---
+    # prominence-only: this is the parameterization that reproduces the
+    # archived pilot outputs (see module docstring).
+    force = belt['force_smooth'].to_numpy()
+    crests, _ = find_peaks(force, prominence=0.5)
+    troughs, _ = find_peaks(-force, prominence=0.5)
+
+    # --- Respiratory phase for every belt sample ---
+    belt['phase_deg'] = compute_belt_phase(
+        belt['t_utc'].to_numpy(), force, troughs, crests
+    )
+
+    # --- Load RT trials and map responses onto belt phase ---
+    # pyarrow parses the CSV multithreaded and hands back the response
+    # timestamps already as datetime64, so no separate to_datetime pass.
+    rt = pd.read_csv(rt_file, engine='pyarrow', parse_dates=['response_timestamp_utc'])
+    rt['response_ts_sec'] = (
+        rt['response_timestamp_utc'].dt.as_unit('ns').astype('int64') / 1e9
+    )
+
+    phase_deg, codes = assign_phase(
+        belt['t_utc'].to_numpy(),
+        belt['phase_deg'].to_numpy(),
+        rt['response_ts_sec'].to_numpy(),
+    )
+    rt['resp_phase_deg'] = phase_deg
+    # 1-byte codes + two category strings instead of a full string array
+    rt['resp_phase_label'] = pd.Categorical.from_codes(
+        codes, categories=['exhalation', 'inhalation']
+    )
+
+    out_file = os.path.join(config.MERGED_DIR, f"{pid}_RT_with_phase.csv")
+    rt.to_csv(out_file, index=False)
+    print(f"  Saved {out_file}")
+
+    rt = rt.copy()
+    rt['participant_id'] = pid
+    return rt
+
+
+def main():
+    os.makedirs(config.MERGED_DIR, exist_ok=True)
+
+    participant_ids = get_participant_ids()
+
+    # Participants are independent, so process them across all cores.
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        results = list(ex.map(process_one_participant, participant_ids))
+    all_participants = [df for df in results if df is not None]
+
+    if all_participants:
+        master_df = pd.concat(all_participants, ignore_index=True)
+        master_file = os.path.join(config.MERGED_DIR, "master_RT_with_phase.csv")
+        master_df.to_csv(master_file, index=False)
+        print(f"Master file saved to {master_file}")
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    cleaned = clean_and_create_master(timestamp)
+    create_master_file(timestamp, cleaned)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
-from pathlib import Path
 
 # ===================== CONFIG =====================
 
@@ -19,44 +22,53 @@ MAX_RT = 5.0                # seconds; sanity bound, not enforced by default
 # ================================================
 
 
+_NAT_NS = np.int64(np.iinfo(np.int64).min)  # int64 representation of NaT
+
+
 def reconstruct_rt_csv(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+    # Shallow copy: column assignments below never touch the caller's data,
+    # so there is no need to duplicate the whole input up front.
+    df = df.copy(deep=False)
 
     # --- Parse timestamps ---
     for col in TIMESTAMP_COLS:
         df[col] = pd.to_datetime(df[col], utc=True, errors="coerce")
 
+    # Work on raw int64 nanoseconds from here on; each step below is a
+    # single numpy pass instead of going through the .dt accessors.
+    sched_ns = df["scheduled_timestamp_utc"].dt.as_unit("ns").astype("int64").to_numpy()
+    onset_ns = df["actual_onset_timestamp_utc"].dt.as_unit("ns").astype("int64").to_numpy()
+    resp_ns = df["response_timestamp_utc"].dt.as_unit("ns").astype("int64").to_numpy()
+    sched_nat = sched_ns == _NAT_NS
+    onset_nat = onset_ns == _NAT_NS
+    resp_nat = resp_ns == _NAT_NS
+
     # --- Compute onset deviation ---
-    onset_delta = (
-        df["actual_onset_timestamp_utc"]
-        - df["scheduled_timestamp_utc"]
-    ).dt.total_seconds()
+    onset_delta_s = (onset_ns - sched_ns) / 1e9
 
     # --- Identify valid onset timestamps ---
     onset_ok = (
-        onset_delta.notna()
-        & onset_delta.abs().lt(MAX_ONSET_DEVIATION)
+        ~sched_nat & ~onset_nat
+        & (np.abs(onset_delta_s) < MAX_ONSET_DEVIATION)
     )
 
     # --- Estimate audio latency from valid trials ---
     if onset_ok.sum() == 0:
         raise ValueError("No valid onset timestamps available to estimate audio latency.")
 
-    audio_latency = onset_delta[onset_ok].median()
+    audio_latency = np.median(onset_delta_s[onset_ok])
 
     # --- Reconstruct onset timestamps ---
-    df["actual_onset_timestamp_utc_reconstructed"] = np.where(
-        onset_ok,
-        df["actual_onset_timestamp_utc"],
-        df["scheduled_timestamp_utc"]
-        + pd.to_timedelta(audio_latency, unit="s"),
+    recon_ns = np.where(onset_ok, onset_ns, sched_ns + np.int64(round(audio_latency * 1e9)))
+    recon_ns[~onset_ok & sched_nat] = _NAT_NS  # keep NaT where the schedule is missing
+    df["actual_onset_timestamp_utc_reconstructed"] = pd.DatetimeIndex(
+        recon_ns.view("datetime64[ns]"), tz="UTC"
     )
 
     # --- Recompute RT ---
-    df["RT_seconds_reconstructed"] = (
-        df["response_timestamp_utc"]
-        - df["actual_onset_timestamp_utc_reconstructed"]
-    ).dt.total_seconds()
+    rt_s = (resp_ns - recon_ns) / 1e9
+    rt_s[resp_nat | (recon_ns == _NAT_NS)] = np.nan
+    df["RT_seconds_reconstructed"] = rt_s
 
     # --- Flags for auditing ---
     df["onset_reconstructed"] = ~onset_ok
@@ -65,29 +77,56 @@ def reconstruct_rt_csv(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def batch_reconstruct(input_dir: Path, output_dir: Path):
+def _process_one(csv_path: Path, output_dir: Path) -> str:
+    df = pd.read_csv(csv_path)
+    df_fixed = reconstruct_rt_csv(df)
+
+    out_path = output_dir / csv_path.name
+    df_fixed.to_csv(out_path, index=False)
+    return csv_path.name
+
+
+def batch_reconstruct(input_dir: Path, output_dir: Path, force: bool = False):
     output_dir.mkdir(parents=True, exist_ok=True)
 
     csv_files = sorted(input_dir.glob("*.csv"))
     if not csv_files:
         raise FileNotFoundError(f"No CSV files found in {input_dir}")
 
+    # Skip files whose output is already newer than the input.
+    todo = []
     for csv_path in csv_files:
-        print(f"Processing {csv_path.name} ...")
-
-        try:
-            df = pd.read_csv(csv_path)
-            df_fixed = reconstruct_rt_csv(df)
-
-            out_path = output_dir / csv_path.name
-            df_fixed.to_csv(out_path, index=False)
-
-        except Exception as e:
-            print(f"  ❌ Failed: {csv_path.name}")
-            print(f"     Reason: {e}")
+        out_path = output_dir / csv_path.name
+        if not force and out_path.exists() and out_path.stat().st_mtime >= csv_path.stat().st_mtime:
+            print(f"Skipping {csv_path.name} (output up to date)")
+            continue
+        todo.append(csv_path)
+
+    if not todo:
+        print("\nNothing to do, all outputs up to date.")
+        return
+
+    # Files are independent, so reconstruct them in parallel.
+    with ProcessPoolExecutor(max_workers=min(8, os.cpu_count())) as ex:
+        futures = {ex.submit(_process_one, p, output_dir): p for p in todo}
+
+        for fut in as_completed(futures):
+            csv_path = futures[fut]
+            try:
+                print(f"Processed {fut.result()}")
+            except Exception as e:
+                print(f"  ❌ Failed: {csv_path.name}")
+                print(f"     Reason: {e}")
 
     print("\nBatch reconstruction complete.")
 
 
 if __name__ == "__main__":
-    batch_reconstruct(INPUT_DIR, OUTPUT_DIR)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Reconstruct RT CSVs.")
+    parser.add_argument("--force", action="store_true",
+                        help="reprocess files even when the output is up to date")
+    args = parser.parse_args()
+
+    batch_reconstruct(INPUT_DIR, OUTPUT_DIR, force=args.force)